@@ -1,38 +1,66 @@
 
 import os
+import sys
 import time
+import threading
+
+from helpers.startup_helper import StartupHelper
+
+# Cronômetro de boot: precisa existir antes dos imports pesados
+startup = StartupHelper()
+
 from concurrent.futures import ThreadPoolExecutor
 
-from rich import print
-from rich.layout import Layout
-from rich.panel import Panel
-from rich.live import Live
-from rich.console import Console
-from rich.text import Text
-from rich.table import Column, Table
-from rich.console import Group
-
-from datetime import datetime
-from rich import box
-from rich.panel import Panel
-from rich.table import Table
-from rich.text import Text
-
-from external.hardware_service import HardwareService
-from external.network_service import NetworkService
-from external.time_service import TimeService
-from external.gps_service import GpsService
+with startup.measure("import rich"):
+    from rich.layout import Layout
+    from rich.panel import Panel
+    from rich.live import Live
+    from rich.table import Table
 
+from helpers.dashboard_state_helper import DashboardStateHelper
 from helpers.network_helper import NetworkHelper
 
-# Services
-hardware_service = HardwareService()
-network_service = NetworkService()
-time_service = TimeService()
-gps_service = GpsService()
-
 
 ASCII_PATH = "/home/kombios/kombi_os/files/ascii/kombi_ascii.txt"
+STATE_PATH = "/home/kombios/kombi_os/files/state/dashboard.json"
+
+# Estado salvo na última execução (carregado em main, antes do primeiro frame)
+warm_state = {}
+
+# Services (criados sob demanda, na thread do builder que precisar primeiro)
+def _hardware_service():
+    return startup.import_module("external.hardware_service").HardwareService()
+
+def _network_service():
+    return startup.import_module("external.network_service").NetworkService()
+
+def _time_service():
+    return startup.import_module("external.time_service").TimeService()
+
+def _gps_service():
+    gps_service = startup.import_module("external.gps_service").GpsService()
+    gps_service.last_geocode = warm_state.get("geocode")
+    return gps_service
+
+SERVICE_FACTORIES = {
+    "hardware": _hardware_service,
+    "network": _network_service,
+    "time": _time_service,
+    "gps": _gps_service,
+}
+
+_services = {}
+# Um lock por serviço: o import lento de um não segura o primeiro frame
+_service_locks = {name: threading.Lock() for name in SERVICE_FACTORIES}
+
+def get_service(name):
+    with _service_locks[name]:
+        if name not in _services:
+            with startup.measure(f"init {name} service"):
+                _services[name] = SERVICE_FACTORIES[name]()
+        return _services[name]
+
+
 def read_ascii_art():
     if os.path.exists(ASCII_PATH):
         with open(ASCII_PATH, "r") as f:
@@ -40,7 +68,11 @@ def read_ascii_art():
     return "(sem ASCII art ainda)"
 
 
-def build_raspberry_pi_grid():
+# Builders rodam em thread e devolvem só as linhas (label, valor):
+# o grid do Rich é montado no thread principal e as linhas vão para o estado salvo.
+def build_raspberry_pi_rows():
+    hardware_service = get_service("hardware")
+
     ram = hardware_service.get_ram_usage()
     cpu_temp = hardware_service.get_cpu_temp()
     cpu_usage = hardware_service.get_cpu_usage()
@@ -48,23 +80,18 @@ def build_raspberry_pi_grid():
     uptime = hardware_service.get_uptime()
     voltage = hardware_service.get_throttle_status()
 
-    grid = Table.grid(expand=True, pad_edge=True)
-    grid.padding = (0, 0, 2, 0)
-    
-    grid.add_column(justify="left")
-    grid.add_column(justify="right")
-    
-    grid.add_row("🕒 Uptime", f"{uptime}")
-    grid.add_row("🧠 CPU Usage", f"{cpu_usage}%")
-    grid.add_row("📊 RAM Usage", f"{ram['used_mb']}/{ram['total_mb']} MB - {ram['percent']}%")
-    grid.add_row("📀 Disk", f"{disk['used_gb']}/{disk['total_gb']}GB - {disk['percent']}%")
-    grid.add_row("🔥 CPU Temp", f"{cpu_temp}")
-    grid.add_row("⚡ Energy", f"{voltage}")
-    
-    return grid
+    return [
+        ("🕒 Uptime", f"{uptime}"),
+        ("🧠 CPU Usage", f"{cpu_usage}%"),
+        ("📊 RAM Usage", f"{ram['used_mb']}/{ram['total_mb']} MB - {ram['percent']}%"),
+        ("📀 Disk", f"{disk['used_gb']}/{disk['total_gb']}GB - {disk['percent']}%"),
+        ("🔥 CPU Temp", f"{cpu_temp}"),
+        ("⚡ Energy", f"{voltage}"),
+    ]
+
+def build_gps_rows():
+    gps_service = get_service("gps")
 
-def build_gps_grid():
-    
     gps_response = gps_service.get_gps_coords()
 
     lat = gps_response.get("lat", 0)
@@ -80,49 +107,52 @@ def build_gps_grid():
     state = data.get('address', {}).get('state', 'Not Found')
     road = data.get('address', {}).get('road', 'Not Found')
     postal_code = data.get('address', {}).get('postcode', 'Not Found')
-    
-    grid = Table.grid(expand=True, pad_edge=True)
-    grid.padding = (0, 0, 2, 0)
-    
-    grid.add_column(justify="left")
-    grid.add_column(justify="right")
 
-    grid.add_row("🛰️ Satellites", f"{num_satellites}")
-    grid.add_row("📍 Lat/Lon", f"{gps_data}")
-    grid.add_row("🌎 State", f"{state}")
-    grid.add_row("🏘️ City", f"{city}")
-    grid.add_row("🛣️ Street", f"{road}")
-    grid.add_row("📮 ZIP", f"{postal_code}")
+    return [
+        ("🛰️ Satellites", f"{num_satellites}"),
+        ("📍 Lat/Lon", f"{gps_data}"),
+        ("🌎 State", f"{state}"),
+        ("🏘️ City", f"{city}"),
+        ("🛣️ Street", f"{road}"),
+        ("📮 ZIP", f"{postal_code}"),
+    ]
 
-    return grid
+def build_network_rows():
+    hardware_service = get_service("hardware")
+    network_service = get_service("network")
 
-def build_network_grid():
-    
     network_helper = NetworkHelper()
-    
+
     bluetooth = "ON 🟢" if hardware_service.is_bluetooth_on() else "OFF 🔴"
     bluetooth_device_name = hardware_service.get_connected_bluetooth_device_name()
     wifi_data = network_service.get_wifi_info()
-    wifi =  network_helper.wifi_status(wifi_data['ssid'], wifi_data['rssi_dbm']) 
-    
+    wifi =  network_helper.wifi_status(wifi_data['ssid'], wifi_data['rssi_dbm'])
+
     ip_data = network_service.get_ip_address()
     is_online = network_service.is_online()
-    
+
     download_speed, upload_speed = network_service.get_network_usage()
-    
+
+    return [
+        ("🌐 Status", "ON 🟢" if is_online else "OFF 🔴"),
+        ("🌐 IP", f"{ip_data['local_ip']}"),
+        ("🛜 Wifi", f"{wifi}"),
+        ("📶 LTE", "OFF 🔴"),
+        ("🔵 Bluetooth", f"{bluetooth} {bluetooth_device_name}"),
+        ("⬆️ Upload", f"{upload_speed/1024:.2f} KB/s"),
+        ("⬇️ Download", f"{download_speed/1024:.2f} KB/s"),
+    ]
+
+def render_grid(rows, stale=False):
     grid = Table.grid(expand=True, pad_edge=True)
-    
-    grid.add_column(justify="left")
-    grid.add_column(justify="right")
-
-    grid.add_row("🌐 Status", f"{"ON 🟢" if is_online else "OFF 🔴"}")
-    grid.add_row("🌐 IP", f"{ip_data["local_ip"]}")
-    grid.add_row("🛜 Wifi", f"{wifi}")
-    grid.add_row("📶 LTE", "OFF 🔴")
-    grid.add_row("🔵 Bluetooth", f"{bluetooth} {bluetooth_device_name}")
-    grid.add_row("⬆️ Upload", f"{upload_speed/1024:.2f} KB/s")
-    grid.add_row("⬇️ Download", f"{download_speed/1024:.2f} KB/s")
-        
+    grid.padding = (0, 0, 2, 0)
+
+    grid.add_column(justify="left", style="dim" if stale else None)
+    grid.add_column(justify="right", style="dim" if stale else None)
+
+    for label, value in rows:
+        grid.add_row(label, value)
+
     return grid
 
 def draw_layout() -> Layout:
@@ -138,7 +168,7 @@ def draw_layout() -> Layout:
         Layout(Panel(read_ascii_art()), ratio=3),
         Layout(name="header_panel", ratio=7),
     )
-    
+
     layout["header"]["header_panel"].split_row(
         Layout(name="raspberry_pi"),
         Layout(name="network"),
@@ -147,8 +177,14 @@ def draw_layout() -> Layout:
 
 
     return layout
-  
+
+def current_time():
+    # TimeService é trivial: importado no thread principal sem custo relevante
+    return get_service("time").get_current_time()
+
 def main():
+    startup_report = "--startup-report" in sys.argv
+
     layout = draw_layout()
     # print(layout.tree)
 
@@ -162,72 +198,114 @@ def main():
             "interval": 2.0,
             "ref": rasp_ref,
             "title": "Raspberry Pi 💻",
-            "builder": build_raspberry_pi_grid,
+            "builder": build_raspberry_pi_rows,
             "future": None,
             "next_due": 0.0,
+            "loaded": False,
         },
         "net": {
             "interval": 2.0,
             "ref": net_ref,
             "title": "Network 🌐",
-            "builder": build_network_grid,
+            "builder": build_network_rows,
             "future": None,
             "next_due": 0.0,
+            "loaded": False,
         },
         "gps": {
             "interval": 5.0,
             "ref": gps_ref,
             "title": "GPS 🧭",
-            "builder": build_gps_grid,
+            "builder": build_gps_rows,
             "future": None,
             "next_due": 0.0,
+            "loaded": False,
         },
     }
 
+    # Estado "quente": último conteúdo conhecido de cada painel (e último geocode)
+    state_helper = DashboardStateHelper(STATE_PATH)
+    with startup.measure("restore warm state"):
+        warm_state.update(state_helper.load())
+    warm_sections = warm_state.get("sections") or {}
+
     # executor com 3 workers (uma por seção)
+    # Os builders só são disparados depois do primeiro frame (passo 2 do loop):
+    # os imports deles disputariam o GIL com o desenho do estado salvo.
     executor = ThreadPoolExecutor(max_workers=3)
 
+    # Painéis com estado salvo aparecem na hora, marcados como stale
+    snapshot = {}
+    for key, cfg in SECTIONS.items():
+        rows = warm_sections.get(key)
+        if rows:
+            snapshot[key] = rows
+            cfg["ref"].update(Panel(render_grid(rows, stale=True), title=f"{cfg['title']} (stale)"))
+
+    def save_state(force=False):
+        gps_service = _services.get("gps")
+        geocode = gps_service.last_geocode if gps_service else warm_state.get("geocode")
+        state_helper.save(snapshot, geocode, force=force)
+
     # título inicial
-    panel = Panel(layout, title=f"Kombi O.S. v1.0.0 - {time_service.get_current_time()}")
-    with Live(panel, refresh_per_second=10, screen=True, vertical_overflow="visible") as live:
-        now = time.monotonic()
-        last_title = now - 1.0  # força 1ª atualização do título
+    panel = Panel(layout, title=f"Kombi O.S. v1.0.0 - {current_time()}")
+    try:
+        with Live(panel, refresh_per_second=10, screen=True, vertical_overflow="visible") as live:
+            live.refresh()
+            startup.mark("first frame" + (" (warm state)" if snapshot else " (empty)"))
 
-        while True:
             now = time.monotonic()
-
-            # 1) Atualiza TÍTULO a cada 1s (barato, no thread principal)
-            if now - last_title >= 1.0:
-                live.update(Panel(layout, title=f"Kombi O.S. v1.0.0 - {time_service.get_current_time()}"))
-                last_title = now
-
-            # 2) Dispara tarefas pendentes (se chegou a hora e não há future rodando)
-            for key, cfg in SECTIONS.items():
-                if cfg["future"] is None and now >= cfg["next_due"]:
-                    # envia para thread: apenas construir o GRID (sem tocar em Rich)
-                    cfg["future"] = executor.submit(cfg["builder"])
-
-            # 3) Consome resultados prontos (sem bloquear)
-            for key, cfg in SECTIONS.items():
-                fut = cfg["future"]
-                if fut is not None and fut.done():
-                    try:
-                        grid = fut.result()  # obter grid pronto
-                        # Atualiza o painel no thread principal
-                        cfg["ref"].update(Panel(grid, title=cfg["title"]))
-                    except Exception as e:
-                        # Se algo falhar, exibe erro no painel para não quebrar a UI
-                        err = Table.grid()
-                        err.add_column()
-                        err.add_row(f"[red]Error:[/red] {e}")
-                        cfg["ref"].update(Panel(err, title=f"{cfg['title']} (error)"))
-                    finally:
-                        cfg["future"] = None
-                        cfg["next_due"] = now + cfg["interval"]
-
-            # 4) loop leve (cede CPU)
-            time.sleep(0.30)
+            last_title = now - 1.0  # força 1ª atualização do título
+
+            while True:
+                now = time.monotonic()
+
+                # 1) Atualiza TÍTULO a cada 1s (barato, no thread principal)
+                if now - last_title >= 1.0:
+                    live.update(Panel(layout, title=f"Kombi O.S. v1.0.0 - {current_time()}"))
+                    last_title = now
+
+                # 2) Dispara tarefas pendentes (se chegou a hora e não há future rodando)
+                for key, cfg in SECTIONS.items():
+                    if cfg["future"] is None and now >= cfg["next_due"]:
+                        # envia para thread: apenas coletar as linhas (sem tocar em Rich)
+                        cfg["future"] = executor.submit(cfg["builder"])
+
+                # 3) Consome resultados prontos (sem bloquear)
+                for key, cfg in SECTIONS.items():
+                    fut = cfg["future"]
+                    if fut is not None and fut.done():
+                        try:
+                            rows = fut.result()  # obter linhas prontas
+                            # Atualiza o painel no thread principal
+                            cfg["ref"].update(Panel(render_grid(rows), title=cfg["title"]))
+                            snapshot[key] = rows
+                        except Exception as e:
+                            # Se algo falhar, exibe erro no painel para não quebrar a UI
+                            err = Table.grid()
+                            err.add_column()
+                            err.add_row(f"[red]Error:[/red] {e}")
+                            cfg["ref"].update(Panel(err, title=f"{cfg['title']} (error)"))
+                        finally:
+                            cfg["future"] = None
+                            cfg["next_due"] = now + cfg["interval"]
+                            cfg["loaded"] = True
+
+                if all(cfg["loaded"] for cfg in SECTIONS.values()):
+                    startup.mark("all panels loaded")
+                    if startup_report:
+                        break
+
+                save_state()
+
+                # 4) loop leve (cede CPU)
+                time.sleep(0.30)
+    finally:
+        save_state(force=True)
+        executor.shutdown(wait=False, cancel_futures=True)
+        if startup_report:
+            print(startup.report(), file=sys.stderr)
 
 if __name__ == "__main__":
     main()
-        
+
@@ -1,10 +1,6 @@
-import io
 import json
-import requests
 import shelve
 import hashlib
-import serial
-import pynmea2
 from loggers.logger import logger
 
 CURRENT_POSITION_FILE = "/var/log/kombios/gps/current.position"
@@ -14,6 +10,8 @@ class GpsService:
         self.url = "https://nominatim.openstreetmap.org/reverse"
         self.headers = {"User-Agent": "KombiOS-GPS/1.0"}
         self.cache_file = cache_file
+        # Último geocode (pode ser restaurado do estado salvo do dashboard)
+        self.last_geocode = None
 
     def dm_to_decimal(self, dm, direction):
         """Converte ddmm.mmmm para decimal (negativo se S/W)."""
@@ -61,9 +59,14 @@ class GpsService:
 
     def get_data_from_coords(self, lat, lon):
         key = self._make_key(lat, lon)
+        if self.last_geocode and self.last_geocode.get("key") == key:
+            return self.last_geocode["data"]
+
         with shelve.open(self.cache_file) as cache:
             if key in cache:
-                return cache[key]
+                data = cache[key]
+                self.last_geocode = {"key": key, "lat": lat, "lon": lon, "data": data}
+                return data
 
             params = {
                 "lat": lat,
@@ -73,7 +76,10 @@ class GpsService:
             }
             logger.info(f"Getting GPS location: {lat}, {lon}")
 
+            import requests  # lazy: só necessário quando o cache falha
+
             response = requests.get(self.url, params=params, headers=self.headers)
             data = response.json()
             cache[key] = data
-            return data
\ No newline at end of file
+            self.last_geocode = {"key": key, "lat": lat, "lon": lon, "data": data}
+            return data
@@ -4,11 +4,16 @@ import psutil
 import subprocess
 from loggers.logger import logger
 
+# Janela mínima para a leitura de CPU sem intervalo fazer sentido
+MIN_CPU_SAMPLE_SEC = 0.5
+
 
 class HardwareService:
     
     def __init__(self):
-        pass
+        # Primeira chamada sem intervalo só inicializa o contador do psutil
+        psutil.cpu_percent(interval=None)
+        self._cpu_sampled_at = time.monotonic()
     
     def get_ram_usage(self) -> dict:
         mem = psutil.virtual_memory()
@@ -31,9 +36,16 @@ class HardwareService:
             logger.error(f"Fail in Get CPU Temperature")
             return "N/D"
         
-    def get_cpu_usage(self):
-        """Return current CPU usage as a percentage."""
-        return psutil.cpu_percent(interval=1)
+    def get_cpu_usage(self, interval=None):
+        """Return CPU usage as a percentage since the previous call (non-blocking by default)."""
+        if interval is None:
+            # Logo após o __init__ a janela seria quase zero: espera completar o mínimo
+            elapsed = time.monotonic() - self._cpu_sampled_at
+            if elapsed < MIN_CPU_SAMPLE_SEC:
+                time.sleep(MIN_CPU_SAMPLE_SEC - elapsed)
+        usage = psutil.cpu_percent(interval=interval)
+        self._cpu_sampled_at = time.monotonic()
+        return usage
     
     def get_disk_usage(self, path="/"):
         """Return disk usage for a given path (in GB and %)."""
@@ -6,7 +6,10 @@ import psutil
 import time
 
 class NetworkService:
-    
+
+    def __init__(self):
+        self._last_net_sample = None
+
     def get_local_ip(self):
         """Retorna o IP local (LAN)"""
         try:
@@ -21,6 +24,8 @@ class NetworkService:
     def get_public_ip(self):
         """Retorna o IP público (externo)"""
         try:
+            import requests  # lazy: evita o custo do import no boot
+
             ip = requests.get("https://api.ipify.org", timeout=2).text
             return ip
         except Exception:
@@ -109,12 +114,20 @@ class NetworkService:
         return {"ssid": None, "bssid": None, "rssi_dbm": None}
     
     def get_network_usage(self, interval=1):
-        net1 = psutil.net_io_counters()
-        time.sleep(interval)
-        
-        net2 = psutil.net_io_counters()
+        """
+        Velocidade de download/upload (bytes/s) desde a chamada anterior.
+        Só bloqueia por `interval` segundos na primeira chamada.
+        """
+        if self._last_net_sample is None:
+            self._last_net_sample = (time.monotonic(), psutil.net_io_counters())
+            time.sleep(interval)
+
+        last_time, net1 = self._last_net_sample
+        now, net2 = time.monotonic(), psutil.net_io_counters()
+        self._last_net_sample = (now, net2)
+        elapsed = max(now - last_time, 1e-6)
 
-        download_speed = (net2.bytes_recv - net1.bytes_recv) / interval
-        upload_speed   = (net2.bytes_sent - net1.bytes_sent) / interval
+        download_speed = (net2.bytes_recv - net1.bytes_recv) / elapsed
+        upload_speed   = (net2.bytes_sent - net1.bytes_sent) / elapsed
 
         return download_speed, upload_speed
\ No newline at end of file
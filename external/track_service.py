@@ -0,0 +1,300 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+HISTORIC_POSITION_FILE = "/var/log/kombios/gps/historic.position"
+
+BATCH_SIZE = 4096
+SEEK_BLOCK_BYTES = 64 * 1024
+TRIP_GAP = timedelta(minutes=5)
+
+
+class TrackService:
+    """
+    Exporta o histórico do GPS (historic.position, JSONL) em GPX, GeoJSON ou CSV.
+
+    Tudo é feito em streaming (memória constante): o arquivo é lido em lotes,
+    o início do intervalo é achado por busca binária no arquivo e a leitura
+    para assim que passa do fim do intervalo. Cada lote é formatado e escrito
+    de uma vez só (um write por lote).
+    """
+
+    FORMATS = ("gpx", "geojson", "csv")
+
+    def __init__(self, history_file=HISTORIC_POSITION_FILE, batch_size=BATCH_SIZE, trip_gap=TRIP_GAP):
+        self.history_file = history_file
+        self.batch_size = batch_size
+        self.trip_gap = trip_gap
+
+    # ---------- leitura ----------
+    @staticmethod
+    def parse_time(record: dict):
+        """Data + hora do fix em UTC (None se o registro não tiver data/hora)."""
+        datestamp = record.get("datestamp")
+        timestamp = record.get("timestamp")
+        if not datestamp or not timestamp:
+            return None
+        try:
+            moment = datetime.fromisoformat(f"{datestamp}T{timestamp}")
+        except (TypeError, ValueError):
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment
+
+    def _line_time(self, line: bytes):
+        try:
+            return self.parse_time(json.loads(line))
+        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+            return None
+
+    def _seek_start(self, f, start: datetime) -> int:
+        """Busca binária pelo offset da primeira linha com horário >= start."""
+        size = os.fstat(f.fileno()).st_size
+        lo, hi = 0, size
+        while hi - lo > SEEK_BLOCK_BYTES:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            f.readline()  # descarta a linha cortada ao meio
+            moment = None
+            while moment is None and f.tell() < hi:
+                line = f.readline()
+                if not line:
+                    break
+                moment = self._line_time(line)
+            if moment is None or moment >= start:
+                hi = mid
+            else:
+                lo = mid
+
+        f.seek(lo)
+        if lo:
+            f.readline()
+        return f.tell()
+
+    def _parse_fix(self, line: bytes):
+        """(time, lat, lon, altitude, speed, num_sats, gps_qual) ou None se a linha não for um fix válido."""
+        try:
+            record = json.loads(line)
+            # O serviço de GPS também grava os registros "V" (sem fix), com lat/lon "0.0"
+            if record.get("status") != "A":
+                return None
+            lat, lon = float(record["latitude"]), float(record["longitude"])
+        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError,
+                KeyError, TypeError, ValueError):
+            return None
+        if lat == 0.0 and lon == 0.0:
+            return None
+
+        moment = self.parse_time(record)
+        if moment is None:
+            return None
+        return (moment, lat, lon, record.get("altitude"), record.get("speed"),
+                record.get("num_sats"), record.get("gps_qual"))
+
+    def iter_batches(self, start: datetime = None, end: datetime = None):
+        """
+        Gera listas de até `batch_size` pontos em [start, end), na ordem do arquivo:
+        (trip, time, lat, lon, altitude, speed, num_sats, gps_qual). Uma nova
+        viagem começa quando o intervalo entre dois fixes passa de `trip_gap`.
+        """
+        trip, last = 0, None
+        with open(self.history_file, "rb") as f:
+            if start is not None:
+                self._seek_start(f, start)
+
+            batch = []
+            for line in f:
+                fix = self._parse_fix(line)
+                if fix is None:
+                    continue
+                moment = fix[0]
+                if start is not None and moment < start:
+                    continue
+                if end is not None and moment >= end:
+                    break
+
+                if last is not None and moment - last > self.trip_gap:
+                    trip += 1
+                last = moment
+                batch.append((trip,) + fix)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+
+            if batch:
+                yield batch
+
+    # ---------- formatos ----------
+    def write_csv(self, out, start=None, end=None) -> int:
+        writer = csv.writer(out)
+        writer.writerow(["trip", "time", "latitude", "longitude", "altitude", "speed", "num_sats", "gps_qual"])
+        count = 0
+        for batch in self.iter_batches(start, end):
+            writer.writerows(
+                (trip + 1, moment.isoformat(), f"{lat:.6f}", f"{lon:.6f}", alt, spd, sats, qual)
+                for trip, moment, lat, lon, alt, spd, sats, qual in batch
+            )
+            count += len(batch)
+        return count
+
+    def write_gpx(self, out, start=None, end=None) -> int:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<gpx version="1.1" creator="KombiOS" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        count, current = 0, None
+        for batch in self.iter_batches(start, end):
+            parts = []
+            for trip, moment, lat, lon, alt, _, sats, _ in batch:
+                if trip != current:
+                    if current is not None:
+                        parts.append("</trkseg></trk>\n")
+                    parts.append(f"<trk><name>{escape(f'Trip {trip + 1}')}</name><trkseg>\n")
+                    current = trip
+                ele = f"<ele>{alt}</ele>" if alt is not None else ""
+                sat = f"<sat>{sats}</sat>" if sats is not None else ""
+                parts.append(f'<trkpt lat="{lat:.6f}" lon="{lon:.6f}">{ele}'
+                             f'<time>{moment.strftime("%Y-%m-%dT%H:%M:%SZ")}</time>{sat}</trkpt>\n')
+            out.write("".join(parts))
+            count += len(batch)
+        if current is not None:
+            out.write("</trkseg></trk>\n")
+        out.write("</gpx>\n")
+        return count
+
+    def write_geojson(self, out, start=None, end=None) -> int:
+        """
+        Uma Feature LineString por viagem. Viagem com um único fix vira uma
+        Feature Point (LineString exige 2 pontos), então todo fix contado é escrito.
+        """
+        # A geometria vem antes das propriedades para poder ser escrita à medida que os pontos chegam
+        out.write('{"type": "FeatureCollection", "features": [')
+        count, features = 0, 0
+        current, first_point, points, began, last_moment = None, None, 0, None, None
+
+        def close_trip(parts):
+            nonlocal features
+            if points == 1:
+                parts.append(("," if features else "") + '\n{"type": "Feature", "geometry": '
+                             f'{{"type": "Point", "coordinates": {first_point}}}')
+                features += 1
+            else:
+                parts.append("]}")
+            parts.append(f', "properties": {{"trip": {current + 1}, "points": {points}, '
+                         f'"start": "{began.isoformat()}", "end": "{last_moment.isoformat()}"}}}}')
+
+        for batch in self.iter_batches(start, end):
+            parts = []
+            for trip, moment, lat, lon, *_ in batch:
+                coord = f"[{lon:.6f}, {lat:.6f}]"
+                if trip != current:
+                    if current is not None:
+                        close_trip(parts)
+                    current, first_point, points, began = trip, coord, 1, moment
+                elif points == 1:
+                    # Só abre a LineString no segundo ponto
+                    parts.append(("," if features else "") + '\n{"type": "Feature", "geometry": '
+                                 f'{{"type": "LineString", "coordinates": [{first_point}, {coord}')
+                    features += 1
+                    points += 1
+                else:
+                    parts.append(f", {coord}")
+                    points += 1
+                last_moment = moment
+            out.write("".join(parts))
+            count += len(batch)
+
+        tail = []
+        if current is not None:
+            close_trip(tail)
+        tail.append("\n]}\n")
+        out.write("".join(tail))
+        return count
+
+    def export(self, fmt: str, out, start: datetime = None, end: datetime = None) -> int:
+        """Escreve o histórico em `out` no formato pedido e retorna o nº de registros."""
+        writers = {"gpx": self.write_gpx, "geojson": self.write_geojson, "csv": self.write_csv}
+        if fmt not in writers:
+            raise ValueError(f"Unknown format '{fmt}' (expected one of {self.FORMATS})")
+        return writers[fmt](out, start, end)
+
+
+# ==========================
+# CLI / benchmark
+# ==========================
+def generate_history(path: str, records: int, start: datetime = None):
+    """Gera um historic.position sintético (mesmo formato do serviço de GPS)."""
+    start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with open(path, "w") as f:
+        for i in range(records):
+            # Uma parada de 1h a cada 10 mil pontos para gerar várias viagens
+            moment = start + timedelta(seconds=i + 3600 * (i // 10_000))
+            f.write(json.dumps({
+                "timestamp": moment.strftime("%H:%M:%S"),
+                "latitude": str(round(-23.55 + (i % 10_000) * 1e-5, 6)),
+                "longitude": str(round(-46.63 + (i % 10_000) * 1e-5, 6)),
+                "altitude": 760.0,
+                "gps_qual": 1,
+                "datestamp": moment.strftime("%Y-%m-%d"),
+                "status": "A",
+                "num_sats": 8,
+                "speed": 40.0,
+            }) + "\n")
+
+def benchmark(history_file: str = None, records: int = 1_000_000):
+    tmp = None
+    if history_file is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".position", delete=False).name
+        print(f"Generating {records} synthetic records in {tmp}...", file=sys.stderr)
+        generate_history(tmp, records)
+        history_file = tmp
+
+    try:
+        service = TrackService(history_file)
+        for fmt in TrackService.FORMATS:
+            with open(os.devnull, "w") as out:
+                started = time.perf_counter()
+                count = service.export(fmt, out)
+                elapsed = time.perf_counter() - started
+            print(f"{fmt:>8}: {count} records in {elapsed:.2f}s ({count / elapsed:,.0f} records/s)",
+                  file=sys.stderr)
+    finally:
+        if tmp:
+            os.remove(tmp)
+
+def parse_cli_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export KombiOS GPS history as GPX, GeoJSON or CSV")
+    parser.add_argument("--format", choices=TrackService.FORMATS, default="gpx")
+    parser.add_argument("--input", default=None, help=f"history file (default: {HISTORIC_POSITION_FILE})")
+    parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--start", type=parse_cli_time, help="ISO date/time, UTC if no offset (inclusive)")
+    parser.add_argument("--end", type=parse_cli_time, help="ISO date/time, UTC if no offset (exclusive)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="measure export throughput (records/s); uses --input or a synthetic history")
+    parser.add_argument("--records", type=int, default=1_000_000, help="synthetic history size for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.input, args.records)
+        return
+
+    service = TrackService(args.input or HISTORIC_POSITION_FILE)
+    if args.output == "-":
+        count = service.export(args.format, sys.stdout, args.start, args.end)
+    else:
+        with open(args.output, "w", buffering=io.DEFAULT_BUFFER_SIZE * 16, newline="") as out:
+            count = service.export(args.format, out, args.start, args.end)
+    print(f"Exported {count} records", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import json
+import os
+import time
+
+
+class DashboardStateHelper:
+    """
+    Persiste o último conteúdo de cada painel (e o último geocode) para que o
+    primeiro frame após o boot seja desenhado na hora, marcado como "stale".
+    """
+
+    def __init__(self, path: str, min_save_interval: float = 30.0):
+        self.path = path
+        self.min_save_interval = min_save_interval
+        self.last_saved = 0.0
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return {}
+
+    def save(self, sections: dict, geocode: dict = None, force: bool = False) -> bool:
+        """Grava o estado de forma atômica, no máximo a cada `min_save_interval` segundos."""
+        now = time.monotonic()
+        if not force and now - self.last_saved < self.min_save_interval:
+            return False
+
+        state = {"saved_at": time.time(), "sections": sections, "geocode": geocode}
+        tmp = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            return False
+
+        self.last_saved = now
+        return True
@@ -0,0 +1,45 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupHelper:
+    """
+    Mede o tempo de boot do dashboard (imports, criação de serviços e
+    primeiro frame), no estilo do `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.entries = []
+        self.marks = []
+
+    @contextmanager
+    def measure(self, name: str):
+        """Cronometra um bloco (import, construção de serviço, etc.)."""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.entries.append((name, time.perf_counter() - begin, begin - self.started))
+
+    def import_module(self, name: str):
+        """Importa um módulo sob demanda e registra o custo do primeiro import."""
+        if name in sys.modules:
+            return sys.modules[name]
+        with self.measure(f"import {name}"):
+            __import__(name)
+        return sys.modules[name]
+
+    def mark(self, name: str):
+        """Registra um marco (ex.: primeiro frame) uma única vez."""
+        if not any(mark == name for mark, _ in self.marks):
+            self.marks.append((name, time.perf_counter() - self.started))
+
+    def report(self) -> str:
+        lines = ["startup time: cumulative [us] |   at [us] | step"]
+        for name, seconds, offset in sorted(self.entries, key=lambda e: e[2]):
+            lines.append(f"startup time: {seconds * 1e6:>15.0f} | {offset * 1e6:>9.0f} | {name}")
+        for name, seconds in self.marks:
+            lines.append(f"startup time: {'':>15} | {seconds * 1e6:>9.0f} | ** {name}")
+        return "\n".join(lines)
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Servidor de ingestão de referência (local) para os serviços de sync do KombiOS.
+
+Implementa os mesmos endpoints que os daemons gps-sync e network-sync usam
+em produção, mais variantes em lote, para testar uplink, batching e carga
+numa única máquina Linux:
+
+    POST /gps/last-position      -> um registro de posição
+    POST /gps/bulk               -> lista de registros de posição
+    POST /network                -> um registro de status de rede
+    POST /network/bulk           -> lista de registros de rede
+    POST /metrics                -> série do kombios-metrics-service
+    GET  /gps/last-position/<id> -> última posição conhecida do device
+    GET  /stats                  -> contadores do servidor
+
+Os registros são persistidos em SQLite com transações em lote (group commit):
+cada requisição só é respondida depois que o lote que a contém foi gravado.
+Um índice da última posição por device é mantido em memória e em disco.
+
+Uso:
+    python3 kombios-ingest-server.py --port 8080 --db /tmp/kombios-ingest.db
+    SERVER_URL=http://127.0.0.1:8080 python3 kombios-uplink-service.py
+"""
+import argparse
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+# ==========================
+# Global Configurations
+# ==========================
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8080
+DEFAULT_DB_PATH = "/tmp/kombios-ingest.db"
+BATCH_MAX_ROWS = 2000
+BATCH_MAX_DELAY_SEC = 0.01
+MAX_BODY_BYTES = 8 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT_SEC = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS gps_position (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    received_at REAL NOT NULL,
+    timestamp TEXT,
+    datestamp TEXT,
+    latitude REAL,
+    longitude REAL,
+    altitude REAL,
+    gps_quality INTEGER,
+    status TEXT,
+    num_sats INTEGER,
+    speed REAL
+);
+CREATE INDEX IF NOT EXISTS gps_position_device ON gps_position (device_id, received_at);
+
+CREATE TABLE IF NOT EXISTS latest_position (
+    device_id TEXT PRIMARY KEY,
+    received_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS network_status (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    received_at REAL NOT NULL,
+    status INTEGER,
+    local_ip TEXT,
+    public_ip TEXT,
+    ssid TEXT,
+    wifi_status INTEGER,
+    wifi_signal_strength INTEGER,
+    lte_status INTEGER,
+    bluetooth_status INTEGER
+);
+CREATE INDEX IF NOT EXISTS network_status_device ON network_status (device_id, received_at);
+
+CREATE TABLE IF NOT EXISTS metric_point (
+    device_id TEXT NOT NULL,
+    archive TEXT NOT NULL,
+    t INTEGER NOT NULL,
+    received_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (device_id, archive, t)
+);
+"""
+
+INSERT_GPS = """
+INSERT INTO gps_position (device_id, received_at, timestamp, datestamp, latitude, longitude,
+                          altitude, gps_quality, status, num_sats, speed)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_METRIC = """
+INSERT OR REPLACE INTO metric_point (device_id, archive, t, received_at, payload) VALUES (?, ?, ?, ?, ?)
+"""
+
+UPSERT_LATEST = """
+INSERT INTO latest_position (device_id, received_at, payload) VALUES (?, ?, ?)
+ON CONFLICT (device_id) DO UPDATE SET received_at = excluded.received_at, payload = excluded.payload
+"""
+
+INSERT_NETWORK = """
+INSERT INTO network_status (device_id, received_at, status, local_ip, public_ip, ssid,
+                            wifi_status, wifi_signal_strength, lte_status, bluetooth_status)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERTS = {
+    "gps": INSERT_GPS,
+    "network": INSERT_NETWORK,
+    "metrics": INSERT_METRIC,
+}
+
+HTTP_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+# ==========================
+# Utility Functions
+# ==========================
+def log(level: str, message: str):
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] [{level}] {message}")
+
+# Conversores usados antes do submit(): um valor que o SQLite não consegue
+# gravar vira 400 para quem enviou, em vez de derrubar o lote dos outros.
+SQLITE_INT_MIN, SQLITE_INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+def to_float(record: dict, field: str) -> Optional[float]:
+    # O serviço de GPS grava lat/lon como string
+    value = record.get(field)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{field}' must be a number")
+
+def to_int(record: dict, field: str) -> Optional[int]:
+    value = record.get(field)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{field}' must be an integer")
+    if not SQLITE_INT_MIN <= value <= SQLITE_INT_MAX:
+        raise ValueError(f"'{field}' is out of range")
+    return value
+
+def to_text(record: dict, field: str) -> Optional[str]:
+    value = record.get(field)
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    raise ValueError(f"'{field}' must be a string")
+
+def gps_row(record: dict, device_id: str, received_at: float) -> tuple:
+    return (
+        to_text(record, "deviceId") or device_id,
+        received_at,
+        to_text(record, "timestamp"),
+        to_text(record, "datestamp"),
+        to_float(record, "latitude"),
+        to_float(record, "longitude"),
+        to_float(record, "altitude"),
+        to_int(record, "gpsQuality"),
+        to_text(record, "status"),
+        to_int(record, "numberOfSatellites"),
+        to_float(record, "speed"),
+    )
+
+def network_row(record: dict, device_id: str, received_at: float) -> tuple:
+    return (
+        to_text(record, "deviceId") or device_id,
+        received_at,
+        to_int(record, "status"),
+        to_text(record, "localIp"),
+        to_text(record, "publicIp"),
+        to_text(record, "ssid"),
+        to_int(record, "wifiStatus"),
+        to_int(record, "wifiSignalStrength"),
+        to_int(record, "lteStatus"),
+        to_int(record, "bluetoothStatus"),
+    )
+
+# ==========================
+# Storage (batched SQLite writer)
+# ==========================
+class IngestStore:
+    """
+    Agrupa as gravações de várias requisições numa única transação SQLite.
+
+    O SQLite roda numa thread dedicada (a conexão não é compartilhada), e o
+    loop asyncio só enfileira lotes e aguarda o commit correspondente.
+    """
+
+    def __init__(self, db_path: str, batch_max_rows: int = BATCH_MAX_ROWS,
+                 batch_max_delay: float = BATCH_MAX_DELAY_SEC):
+        self.db_path = db_path
+        self.batch_max_rows = batch_max_rows
+        self.batch_max_delay = batch_max_delay
+        self.latest: dict[str, dict] = {}
+        self.stats = {f"{kind}_rows": 0 for kind in INSERTS}
+        self.stats.update({"transactions": 0, "requests": 0})
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._open_db)
+        self._task = asyncio.create_task(self._writer())
+
+    def _open_db(self):
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        for device_id, payload in self._conn.execute("SELECT device_id, payload FROM latest_position"):
+            self.latest[device_id] = json.loads(payload)
+
+    async def close(self):
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._conn.close)
+        self._executor.shutdown()
+
+    async def submit(self, rows: dict, latest: Optional[dict] = None):
+        """
+        Enfileira as linhas ({"gps": [...], "network": [...], ...}) e retorna
+        quando o lote que as contém for gravado.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, latest or {}, future))
+        await future
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            count = sum(len(r) for r in pending[0][0].values())
+            deadline = loop.time() + self.batch_max_delay
+
+            while count < self.batch_max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                count += sum(len(r) for r in item[0].values())
+
+            rows = {kind: [] for kind in INSERTS}
+            latest = {}
+            for item_rows, item_latest, _ in pending:
+                for kind, kind_rows in item_rows.items():
+                    rows[kind].extend(kind_rows)
+                latest.update(item_latest)
+
+            error = None
+            try:
+                await loop.run_in_executor(self._executor, self._commit, rows, latest)
+                self.latest.update(latest)
+                for kind, kind_rows in rows.items():
+                    self.stats[f"{kind}_rows"] += len(kind_rows)
+                self.stats["transactions"] += 1
+            except Exception as e:
+                # O writer nunca pode morrer: sem ele todo POST ficaria esperando para sempre
+                log("ERROR", f"Batch commit failed: {e}")
+                error = e
+
+            for _, _, future in pending:
+                if not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+
+    def _commit(self, rows: dict, latest: dict):
+        with self._conn:
+            for kind, kind_rows in rows.items():
+                if kind_rows:
+                    self._conn.executemany(INSERTS[kind], kind_rows)
+            if latest:
+                self._conn.executemany(
+                    UPSERT_LATEST,
+                    [(device_id, rec["receivedAt"], json.dumps(rec)) for device_id, rec in latest.items()],
+                )
+
+# ==========================
+# HTTP handlers
+# ==========================
+class IngestServer:
+    def __init__(self, store: IngestStore):
+        self.store = store
+
+    async def handle_gps(self, body, device_id: str, bulk: bool):
+        records = body if bulk else [body]
+        received_at = time.time()
+        rows, latest = [], {}
+        for record in records:
+            if not isinstance(record, dict):
+                return 400, {"error": "records must be JSON objects"}
+            try:
+                row = gps_row(record, device_id, received_at)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            rows.append(row)
+            latest[row[0]] = {**record, "deviceId": row[0], "receivedAt": received_at}
+        await self.store.submit({"gps": rows}, latest)
+        return 202, {"accepted": len(rows)}
+
+    async def handle_network(self, body, device_id: str, bulk: bool):
+        records = body if bulk else [body]
+        received_at = time.time()
+        rows = []
+        for record in records:
+            if not isinstance(record, dict):
+                return 400, {"error": "records must be JSON objects"}
+            try:
+                rows.append(network_row(record, device_id, received_at))
+            except ValueError as e:
+                return 400, {"error": str(e)}
+        await self.store.submit({"network": rows})
+        return 202, {"accepted": len(rows)}
+
+    async def handle_metrics(self, body, device_id: str, bulk: bool):
+        # Série exportada pelo kombios-metrics-service (um arquivo RRD por POST)
+        points = body.get("points", [])
+        if not isinstance(points, list):
+            return 400, {"error": "'points' must be a JSON array"}
+        try:
+            device_id = to_text(body, "deviceId") or device_id
+            archive = to_text(body, "archive") or "unknown"
+        except ValueError as e:
+            return 400, {"error": str(e)}
+
+        received_at = time.time()
+        rows = []
+        for point in points:
+            if not isinstance(point, dict) or point.get("t") is None:
+                return 400, {"error": "points must be JSON objects with a 't' field"}
+            try:
+                t = to_int(point, "t")
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            rows.append((device_id, archive, t, received_at, json.dumps(point)))
+        await self.store.submit({"metrics": rows})
+        return 202, {"accepted": len(rows)}
+
+    async def dispatch(self, method: str, path: str, headers: dict, body: bytes):
+        path = path.split("?", 1)[0].rstrip("/")
+        device_id = headers.get("kombi-id", "unknown")
+
+        if method == "GET":
+            if path == "/stats":
+                return 200, {**self.store.stats, "devices": len(self.store.latest)}
+            if path.startswith("/gps/last-position/"):
+                record = self.store.latest.get(path.rsplit("/", 1)[1])
+                return (200, record) if record else (404, {"error": "device not found"})
+            return 404, {"error": "not found"}
+
+        if method != "POST":
+            return 405, {"error": "method not allowed"}
+
+        routes = {
+            "/gps/last-position": (self.handle_gps, False),
+            "/gps/bulk": (self.handle_gps, True),
+            "/network": (self.handle_network, False),
+            "/network/bulk": (self.handle_network, True),
+            "/metrics": (self.handle_metrics, False),
+        }
+        if path not in routes:
+            return 404, {"error": "not found"}
+
+        try:
+            payload = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+
+        handler, bulk = routes[path]
+        if bulk != isinstance(payload, list):
+            return 400, {"error": "bulk endpoints expect a JSON array, others a JSON object"}
+        return await handler(payload, device_id, bulk)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # HTTP/1.1 mínimo com keep-alive (suficiente para requests e para o gerador de carga)
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT_SEC)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                method, path, version = parts
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, result = 400, {"error": "invalid content-length"}
+                    keep_alive = False
+                elif length > MAX_BODY_BYTES:
+                    status, result = 413, {"error": "payload too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    keep_alive = (
+                        headers.get("connection", "").lower() != "close"
+                        and version == "HTTP/1.1"
+                    )
+                    try:
+                        self.store.stats["requests"] += 1
+                        status, result = await self.dispatch(method, path, headers, body)
+                    except Exception as e:
+                        log("ERROR", f"{method} {path} failed: {e}")
+                        status, result = 500, {"error": str(e)}
+
+                data = json.dumps(result).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+# ==========================
+# Main
+# ==========================
+async def serve(args):
+    store = IngestStore(args.db, args.batch_rows, args.batch_delay_ms / 1000)
+    await store.open()
+    server = IngestServer(store)
+    tcp = await asyncio.start_server(server.handle_connection, args.host, args.port, backlog=1024)
+    log("INFO", f"KombiOS ingest server listening on http://{args.host}:{args.port} (db={args.db})")
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        await store.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="KombiOS local reference ingestion server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_MAX_ROWS,
+                        help="max rows per transaction")
+    parser.add_argument("--batch-delay-ms", type=float, default=BATCH_MAX_DELAY_SEC * 1000,
+                        help="max time to wait while filling a transaction")
+    args = parser.parse_args()
+    asyncio.run(serve(args))
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        log("INFO", "Server interrupted by user. Exiting.")
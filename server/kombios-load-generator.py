@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga para o servidor de ingestão do KombiOS.
+
+Simula centenas de Kombis enviando posições (e, opcionalmente, status de rede)
+para SERVER_URL, reproduzindo trilhas gravadas (historic.position, JSONL do
+serviço de GPS) ou trilhas sintéticas. Cada Kombi mantém uma conexão
+keep-alive própria, como faria o daemon de sync.
+
+Ao final imprime vazão de ingestão (registros/s) e latência do uplink
+(p50/p95/p99/max).
+
+Uso:
+    python3 kombios-load-generator.py --vans 300 --duration 30 --interval 1
+    python3 kombios-load-generator.py --track /var/log/kombios/gps/historic.position --bulk 50
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_SERVER_URL = "http://127.0.0.1:8080"
+
+# ==========================
+# Utility Functions
+# ==========================
+def log(level: str, message: str):
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] [{level}] {message}")
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def load_track(path: str) -> list[dict]:
+    track = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            if data.get("latitude") is not None and data.get("longitude") is not None:
+                track.append(data)
+    return track
+
+def synthetic_track(points: int = 3600) -> list[dict]:
+    # Volta circular de ~2 km em torno de um ponto qualquer (formato do historic.position)
+    lat0, lon0 = -23.55052, -46.633308
+    track = []
+    for i in range(points):
+        angle = 2 * math.pi * i / points
+        track.append({
+            "timestamp": time.strftime("%H:%M:%S", time.gmtime(i)),
+            "latitude": str(round(lat0 + 0.01 * math.sin(angle), 6)),
+            "longitude": str(round(lon0 + 0.01 * math.cos(angle), 6)),
+            "altitude": 760.0,
+            "gps_qual": 1,
+            "datestamp": "2025-01-01",
+            "status": "A",
+            "num_sats": 8,
+            "speed": 40.0,
+        })
+    return track
+
+def gps_payload(record: dict, device_id: str) -> dict:
+    # Mesmo mapeamento do kombios-gps-sync-service.get_json_payload
+    return {
+        "timestamp": record.get("timestamp"),
+        "latitude": record.get("latitude"),
+        "longitude": record.get("longitude"),
+        "altitude": record.get("altitude"),
+        "gpsQuality": record.get("gps_qual"),
+        "datestamp": record.get("datestamp"),
+        "status": record.get("status"),
+        "numberOfSatellites": record.get("num_sats"),
+        "speed": record.get("speed"),
+        "deviceId": device_id,
+    }
+
+def network_payload(device_id: str) -> dict:
+    return {
+        "status": True,
+        "localIp": "192.168.0.10",
+        "publicIp": "200.200.200.200",
+        "ssid": "kombi",
+        "wifiStatus": True,
+        "wifiSignalStrength": random.randint(-90, -40),
+        "lteStatus": False,
+        "bluetoothStatus": False,
+        "deviceId": device_id,
+    }
+
+# ==========================
+# HTTP client (keep-alive)
+# ==========================
+class Connection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def post(self, path: str, payload, device_id: str) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        body = json.dumps(payload).encode()
+        self.writer.write(
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"User-Agent: KombiOS/1.0.0 ({device_id})\r\n"
+            f"Kombi-Id: {device_id}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value.strip())
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        if length:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+# ==========================
+# Van simulation
+# ==========================
+class Results:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.records = 0
+        self.requests = 0
+        self.errors = 0
+
+async def run_van(index: int, track: list[dict], conn: Connection, args, results: Results, stop_at: float):
+    device_id = f"{args.id_prefix}{index:06d}"
+    position = random.randrange(len(track))
+    # Espalha as Kombis ao longo do intervalo para não chegarem todas juntas
+    await asyncio.sleep(random.uniform(0, args.interval))
+    buffer = []
+    sent_network = 0.0
+
+    while time.monotonic() < stop_at:
+        tick = time.monotonic()
+        buffer.append(gps_payload(track[position], device_id))
+        position = (position + 1) % len(track)
+
+        requests = []
+        if args.bulk > 1:
+            if len(buffer) >= args.bulk:
+                requests.append(("/gps/bulk", buffer))
+                buffer = []
+        else:
+            requests.append(("/gps/last-position", buffer.pop()))
+        if args.network_interval and tick - sent_network >= args.network_interval:
+            requests.append(("/network", network_payload(device_id)))
+            sent_network = tick
+
+        for path, payload in requests:
+            started = time.perf_counter()
+            try:
+                status = await conn.post(path, payload, device_id)
+                if 200 <= status < 300:
+                    results.latencies.append(time.perf_counter() - started)
+                    results.records += len(payload) if isinstance(payload, list) else 1
+                else:
+                    results.errors += 1
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                results.errors += 1
+                conn.close()
+                if args.verbose:
+                    log("WARN", f"{device_id} {path} failed: {e}")
+            results.requests += 1
+
+        await asyncio.sleep(max(0.0, args.interval - (time.monotonic() - tick)))
+
+    conn.close()
+
+async def run(args):
+    url = urlsplit(args.server_url)
+    host, port = url.hostname or "127.0.0.1", url.port or 80
+
+    if args.track:
+        track = load_track(args.track)
+        if not track:
+            raise RuntimeError(f"No valid positions found in {args.track}")
+        log("INFO", f"Replaying {len(track)} recorded positions from {args.track}")
+    else:
+        track = synthetic_track()
+        log("INFO", f"Replaying synthetic track with {len(track)} positions")
+
+    results = Results()
+    stop_at = time.monotonic() + args.duration
+    log("INFO", f"Simulating {args.vans} vans against {args.server_url} for {args.duration}s "
+                f"(interval={args.interval}s, bulk={args.bulk})")
+
+    started = time.monotonic()
+    await asyncio.gather(*(
+        run_van(i, track, Connection(host, port), args, results, stop_at)
+        for i in range(args.vans)
+    ))
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(results.latencies)
+    ms = lambda s: f"{s * 1000:.1f} ms"
+    log("INFO", f"Requests: {results.requests} ({results.errors} errors) in {elapsed:.1f}s")
+    log("INFO", f"Ingest throughput: {results.records / elapsed:.0f} records/s, "
+                f"{len(latencies) / elapsed:.0f} requests/s")
+    log("INFO", f"Uplink latency: p50={ms(percentile(latencies, 50))} p95={ms(percentile(latencies, 95))} "
+                f"p99={ms(percentile(latencies, 99))} max={ms(latencies[-1] if latencies else 0)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="KombiOS fleet load generator")
+    parser.add_argument("--server-url", default=os.getenv("SERVER_URL", DEFAULT_SERVER_URL))
+    parser.add_argument("--vans", type=int, default=200, help="number of simulated vans")
+    parser.add_argument("--duration", type=float, default=30.0, help="test duration in seconds")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between GPS fixes per van")
+    parser.add_argument("--bulk", type=int, default=1,
+                        help="positions per request (>1 uses /gps/bulk)")
+    parser.add_argument("--network-interval", type=float, default=0.0,
+                        help="seconds between /network posts per van (0 disables)")
+    parser.add_argument("--track", help="historic.position file to replay (default: synthetic)")
+    parser.add_argument("--id-prefix", default="loadtest-")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        log("INFO", "Load generator interrupted by user. Exiting.")
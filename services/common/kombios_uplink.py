@@ -0,0 +1,58 @@
+"""
+Spool do kombios-uplink-service, compartilhado pelos serviços que enviam dados
+(gps-sync, network-sync, metrics) e pelo próprio uplink. Instalado em
+/usr/local/bin/kombios, ao lado dos scripts, pelo install.sh de cada um desses
+serviços. Para rodar um serviço direto do repositório: PYTHONPATH=services/common.
+
+Os serviços não fazem POST direto: gravam a mensagem aqui e o uplink envia,
+respeitando prioridade da lane e orçamento de dados móveis.
+"""
+import json
+import os
+import time
+from typing import Optional
+
+UPLINK_SPOOL_DIR = os.getenv("UPLINK_SPOOL_DIR", "/var/log/kombios/uplink/spool")
+
+# 0 = sem limite
+HOURLY_BUDGET_BYTES = int(os.getenv("UPLINK_HOURLY_BUDGET_BYTES", "0"))
+MONTHLY_BUDGET_BYTES = int(os.getenv("UPLINK_MONTHLY_BUDGET_BYTES", "0"))
+
+# Cabeçalhos HTTP, TCP e TLS não aparecem no corpo: estimativa fixa por requisição
+REQUEST_OVERHEAD_BYTES = 400
+
+# lane -> (prioridade, fração do orçamento)
+LANES = {
+    "geofence_alert": (0, 1.0),
+    "latest_position": (1, 0.9),
+    "network_status": (2, 0.75),
+    "history_backfill": (3, 0.5),
+}
+
+def message_bytes(path: str, body: dict) -> int:
+    """Tamanho da mensagem no spool, como o uplink conta no orçamento (sem o overhead)."""
+    return len(json.dumps({"path": path, "body": body}))
+
+def max_message_bytes(lane: str) -> Optional[int]:
+    """Maior mensagem (com overhead) que cabe na fatia da lane no orçamento; None = sem limite."""
+    share = LANES[lane][1]
+    limits = [limit * share for limit in (HOURLY_BUDGET_BYTES, MONTHLY_BUDGET_BYTES) if limit]
+    return int(min(limits)) if limits else None
+
+def enqueue_uplink(lane: str, path: str, body: dict, coalesce_key: Optional[str] = None):
+    """
+    Grava a mensagem no spool do uplink. Com coalesce_key, substitui a pendente
+    anterior com a mesma chave. Levanta OSError se não conseguir gravar.
+    """
+    name = f"{lane}.{coalesce_key or time.time_ns()}.json"
+    tmp = os.path.join(UPLINK_SPOOL_DIR, f".{name}.tmp")
+    try:
+        with open(tmp, "w") as f:
+            json.dump({"path": path, "body": body}, f)
+        os.replace(tmp, os.path.join(UPLINK_SPOOL_DIR, name))
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
@@ -1,17 +1,14 @@
 import time
-import requests
 import hashlib
 import json
-import os
 
-
-SERVER_URL = os.getenv("SERVER_URL")  # não "server_url"
-if not SERVER_URL:
-    raise RuntimeError("SERVER_URL não definida")
+from kombios_uplink import enqueue_uplink
 
 
 FILE_PATH = "/var/log/kombios/gps/last.position"
-POST_URL = os.getenv("SERVER_URL") + "/gps/last-position"
+POST_PATH = "/gps/last-position"
+
+UPLINK_LANE = "latest_position"
 
 def system_serial():
     try:
@@ -44,7 +41,7 @@ def get_json_payload(content):
         "speed": content_json.get("speed"),
         "deviceId": system_serial()
     }
-    return json.dumps(gps_data)
+    return gps_data
 
 def main():
     last_hash = None
@@ -53,17 +50,14 @@ def main():
         current_hash, content = file_hash(FILE_PATH)
         if current_hash and current_hash != last_hash:
             try:
-                print(f"[INFO] File changed, sending data to {POST_URL}...")
-                headers = {
-                    "Content-Type": "application/json",
-                    "User-Agent": f"KombiOS/1.0.0 ({system_serial()})",
-                    "Kombi-Id": system_serial()
-                }
-                response = requests.post(POST_URL, data=get_json_payload(content), headers=headers, timeout=5)
-                print(f"[INFO] Server response: {response.status_code}")
-            except requests.RequestException as e:
-                print(f"[ERROR] Failed to send POST: {e}")
-            last_hash = current_hash
+                print(f"[INFO] File changed, queueing {POST_PATH} for uplink...")
+                enqueue_uplink(UPLINK_LANE, POST_PATH, get_json_payload(content), coalesce_key="gps")
+                last_hash = current_hash
+            except json.JSONDecodeError as e:
+                print(f"[ERROR] Invalid position file: {e}")
+                last_hash = current_hash
+            except OSError as e:
+                print(f"[ERROR] Failed to enqueue uplink message: {e}")
 
         time.sleep(5)
 
@@ -85,6 +85,19 @@ else
   run ${SUDO} useradd -r -s /bin/false "${USER_NAME}"
 fi
 
+########################################
+# 1b) Shared modules and uplink spool
+########################################
+# Antes dos install.sh de cada serviço, que já sobem o serviço: os scripts
+# importam kombios_uplink.py e gravam suas mensagens no spool do uplink.
+for MODULE in "${BASE_DIR}"/common/*.py; do
+  run ${SUDO} install -m 0644 "${MODULE}" "${KOMBIOS_BIN_DIR}/"
+done
+
+UPLINK_SPOOL_DIR="/var/log/kombios/uplink/spool"
+run ${SUDO} mkdir -p "${UPLINK_SPOOL_DIR}"
+run ${SUDO} chown "${USER_NAME}:${USER_NAME}" "$(dirname "${UPLINK_SPOOL_DIR}")" "${UPLINK_SPOOL_DIR}"
+
 ########################################
 # 2) Ensure virtualenv
 ########################################
@@ -120,6 +133,8 @@ create_env_file() {
 SERVER_URL=https://api.kombi.digital
 KOMBI_ID=000000000f272617
 PYTHONUNBUFFERED=1
+UPLINK_HOURLY_BUDGET_BYTES=0
+UPLINK_MONTHLY_BUDGET_BYTES=0
 EOF
 
   if [ -f "${ENV_FILE}" ] && cmp -s "${tmpfile}" "${ENV_FILE}"; then
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+KombiOS Metrics Service.
+
+Amostra a saúde do Raspberry Pi (CPU, temperatura, RAM, disco, throttling)
+e grava num arquivo round-robin (estilo RRD) de tamanho fixo, pré-alocado na
+criação, com vários arquivos de resolução:
+
+    10s por 1 dia | 1min por 1 semana | 1h por 1 ano
+
+Cada linha guarda avg/min/max de cada métrica, consolidados no momento da
+inserção. O arquivo nunca cresce (o cartão SD não enche) e a leitura de um
+intervalo custa O(pontos retornados).
+
+Uso:
+    kombios-metrics-service.py                      # loop de coleta (+ uplink)
+    kombios-metrics-service.py export --archive 1m --since 1700000000
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import subprocess
+import time
+from datetime import datetime
+from typing import Optional
+
+import psutil
+
+from kombios_uplink import REQUEST_OVERHEAD_BYTES, enqueue_uplink, max_message_bytes, message_bytes
+
+# ==========================
+# Global Configurations
+# ==========================
+RRD_FILE = os.getenv("METRICS_RRD_FILE", "/var/log/kombios/metrics/health.rrd")
+EXPORT_STATE_FILE = os.getenv("METRICS_EXPORT_STATE_FILE", "/var/log/kombios/metrics/export.state")
+SAMPLE_INTERVAL_SEC = 10
+EXPORT_INTERVAL_SEC = int(os.getenv("METRICS_EXPORT_INTERVAL_SEC", "300"))
+EXPORT_ARCHIVE = os.getenv("METRICS_EXPORT_ARCHIVE", "1m")
+
+UPLINK_LANE = "history_backfill"
+# Teto de pontos por mensagem. Com orçamento de dados, o pedaço também é
+# limitado em bytes à fatia da lane (o uplink retém mensagens maiores)
+EXPORT_MAX_POINTS = int(os.getenv("METRICS_EXPORT_MAX_POINTS", "360"))
+
+DATASOURCES = ["cpu_usage", "cpu_temp", "ram_percent", "disk_percent", "throttled", "under_voltage"]
+
+# (nome, passos base por linha, linhas)
+ARCHIVES = [
+    ("10s", 1, 8640),    # 10s x 8640 = 1 dia
+    ("1m", 6, 10080),    # 1min x 10080 = 1 semana
+    ("1h", 360, 8760),   # 1h x 8760 = 1 ano
+]
+
+CONSOLIDATIONS = ("avg", "min", "max")
+
+# ==========================
+# Utility Functions
+# ==========================
+def log(level: str, message: str):
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] [{level}] {message}")
+
+def system_serial() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("Serial"):
+                    return line.split(":")[1].strip()
+    except Exception:
+        pass
+    return "unknown"
+
+# ==========================
+# Round-robin store
+# ==========================
+class RoundRobinStore:
+    """
+    Arquivo binário de tamanho fixo com arquivos circulares por resolução.
+
+    Layout (little-endian):
+        header      magic, versão, step, nº de métricas, nº de arquivos
+        métricas    nomes (16 bytes cada)
+        arquivos    steps_per_row, rows, último bucket gravado, offset dos dados
+        acumulador  sum/count/min/max por arquivo e métrica (bucket em aberto)
+        dados       rows x métricas x (avg, min, max) em float64, NaN = sem dado
+
+    O bucket B de um arquivo fica na linha B % rows; os buckets válidos são
+    sempre (último - rows, último], então não é preciso gravar timestamps.
+    """
+
+    MAGIC = b"KRRD"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHIHH")
+    NAME = struct.Struct("<16s")
+    ARCHIVE = struct.Struct("<16sIIqq")
+    ACCUM = struct.Struct("<dddd")
+    CELL = struct.Struct("<ddd")
+
+    def __init__(self, path: str, step: int = SAMPLE_INTERVAL_SEC,
+                 datasources: Optional[list] = None, archives: Optional[list] = None):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            self._create(path, step, datasources or DATASOURCES, archives or ARCHIVES)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._load_header()
+
+    # ---------- layout ----------
+    def _create(self, path, step, datasources, archives):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        n_ds = len(datasources)
+        offset = (self.HEADER.size + n_ds * self.NAME.size + len(archives) * self.ARCHIVE.size
+                  + len(archives) * n_ds * self.ACCUM.size)
+
+        header = bytearray(self.HEADER.pack(self.MAGIC, self.VERSION, step, n_ds, len(archives)))
+        for name in datasources:
+            header += self.NAME.pack(name.encode())
+        for name, steps_per_row, rows in archives:
+            header += self.ARCHIVE.pack(name.encode(), steps_per_row, rows, -1, offset)
+            offset += rows * n_ds * self.CELL.size
+        for _ in range(len(archives) * n_ds):
+            header += self.ACCUM.pack(0.0, 0.0, math.nan, math.nan)
+
+        # Pré-aloca tudo com NaN: o tamanho do arquivo fica fixo desde já
+        empty_row = self.CELL.pack(math.nan, math.nan, math.nan) * n_ds
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            for _, _, rows in archives:
+                f.write(empty_row * rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _load_header(self):
+        magic, version, self.step, n_ds, n_arch = self.HEADER.unpack_from(self._mm, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{self.path} is not a KombiOS RRD file (v{self.VERSION})")
+
+        pos = self.HEADER.size
+        self.datasources = []
+        for _ in range(n_ds):
+            self.datasources.append(self.NAME.unpack_from(self._mm, pos)[0].rstrip(b"\0").decode())
+            pos += self.NAME.size
+
+        self.archives = []
+        for i in range(n_arch):
+            name, steps_per_row, rows, _, data_offset = self.ARCHIVE.unpack_from(self._mm, pos)
+            self.archives.append({
+                "index": i,
+                "name": name.rstrip(b"\0").decode(),
+                "steps_per_row": steps_per_row,
+                "rows": rows,
+                "header_pos": pos,
+                "data_offset": data_offset,
+            })
+            pos += self.ARCHIVE.size
+        self._accum_pos = pos
+
+    def _archive(self, name: str) -> dict:
+        for archive in self.archives:
+            if archive["name"] == name:
+                return archive
+        raise KeyError(f"Unknown archive '{name}' (available: {[a['name'] for a in self.archives]})")
+
+    def _last_bucket(self, archive: dict) -> int:
+        return self.ARCHIVE.unpack_from(self._mm, archive["header_pos"])[3]
+
+    def _set_last_bucket(self, archive: dict, bucket: int):
+        struct.pack_into("<q", self._mm, archive["header_pos"] + 24, bucket)
+
+    def _accum_offset(self, archive: dict, ds: int) -> int:
+        return self._accum_pos + (archive["index"] * len(self.datasources) + ds) * self.ACCUM.size
+
+    def _row_offset(self, archive: dict, bucket: int) -> int:
+        row_size = len(self.datasources) * self.CELL.size
+        return archive["data_offset"] + (bucket % archive["rows"]) * row_size
+
+    def bucket_seconds(self, archive: dict) -> int:
+        return self.step * archive["steps_per_row"]
+
+    # ---------- escrita ----------
+    def update(self, values: dict, timestamp: Optional[float] = None):
+        """Registra uma amostra e consolida (avg/min/max) em todos os arquivos."""
+        timestamp = time.time() if timestamp is None else timestamp
+        n_ds = len(self.datasources)
+        nan_row = self.CELL.pack(math.nan, math.nan, math.nan) * n_ds
+
+        for archive in self.archives:
+            bucket = int(timestamp // self.bucket_seconds(archive))
+            last = self._last_bucket(archive)
+
+            if last < 0:
+                self._set_last_bucket(archive, bucket)
+            elif bucket < last:
+                continue  # amostra antiga (relógio voltou): ignora
+            elif bucket > last:
+                # Fecha o bucket em aberto e marca os buckets pulados como sem dado
+                self._flush_accumulator(archive, last)
+                for skipped in range(max(last + 1, bucket - archive["rows"] + 1), bucket):
+                    offset = self._row_offset(archive, skipped)
+                    self._mm[offset:offset + len(nan_row)] = nan_row
+                self._set_last_bucket(archive, bucket)
+
+            for ds, name in enumerate(self.datasources):
+                value = values.get(name)
+                if value is None or math.isnan(value):
+                    continue
+                offset = self._accum_offset(archive, ds)
+                total, count, lo, hi = self.ACCUM.unpack_from(self._mm, offset)
+                self.ACCUM.pack_into(
+                    self._mm, offset,
+                    total + value, count + 1,
+                    value if math.isnan(lo) else min(lo, value),
+                    value if math.isnan(hi) else max(hi, value),
+                )
+
+        self._mm.flush()
+
+    def _flush_accumulator(self, archive: dict, bucket: int):
+        row = self._row_offset(archive, bucket)
+        for ds in range(len(self.datasources)):
+            offset = self._accum_offset(archive, ds)
+            total, count, lo, hi = self.ACCUM.unpack_from(self._mm, offset)
+            avg = total / count if count else math.nan
+            self.CELL.pack_into(self._mm, row + ds * self.CELL.size, avg, lo, hi)
+            self.ACCUM.pack_into(self._mm, offset, 0.0, 0.0, math.nan, math.nan)
+
+    # ---------- leitura ----------
+    def fetch(self, archive_name: str, start: float, end: Optional[float] = None,
+              include_open: bool = True) -> list[dict]:
+        """
+        Retorna os pontos do arquivo em [start, end], do mais antigo ao mais novo.
+        Só percorre as linhas do intervalo pedido (O(pontos retornados)).
+        """
+        archive = self._archive(archive_name)
+        last = self._last_bucket(archive)
+        if last < 0:
+            return []
+
+        seconds = self.bucket_seconds(archive)
+        end = time.time() if end is None else end
+        first_bucket = max(int(start // seconds), last - archive["rows"] + 1)
+        last_bucket = min(int(end // seconds), last)
+
+        points = []
+        for bucket in range(first_bucket, last_bucket + 1):
+            point = {"t": bucket * seconds}
+            if bucket == last:
+                if not include_open:
+                    break
+                for ds, name in enumerate(self.datasources):
+                    total, count, lo, hi = self.ACCUM.unpack_from(self._mm, self._accum_offset(archive, ds))
+                    point[name] = self._cell(total / count if count else math.nan, lo, hi)
+            else:
+                row = self._row_offset(archive, bucket)
+                for ds, name in enumerate(self.datasources):
+                    point[name] = self._cell(*self.CELL.unpack_from(self._mm, row + ds * self.CELL.size))
+            points.append(point)
+        return points
+
+    @staticmethod
+    def _cell(avg: float, lo: float, hi: float) -> Optional[dict]:
+        if math.isnan(avg):
+            return None
+        return {"avg": round(avg, 3), "min": round(lo, 3), "max": round(hi, 3)}
+
+    def export(self, archive_name: str, start: float, end: Optional[float] = None,
+               include_open: bool = False) -> dict:
+        """Série pronta para o uplink (JSON)."""
+        archive = self._archive(archive_name)
+        return {
+            "deviceId": system_serial(),
+            "archive": archive_name,
+            "step": self.bucket_seconds(archive),
+            "datasources": self.datasources,
+            "consolidations": list(CONSOLIDATIONS),
+            "points": [
+                point for point in self.fetch(archive_name, start, end, include_open=include_open)
+                if any(point[name] is not None for name in self.datasources)
+            ],
+        }
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+# ==========================
+# Collectors
+# ==========================
+def read_cpu_temp() -> Optional[float]:
+    try:
+        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
+            return int(f.readline()) / 1000
+    except Exception:
+        return None
+
+def read_throttle_flags() -> tuple[Optional[float], Optional[float]]:
+    # Bits "agora" do vcgencmd: 0x1 = subtensão, 0x4 = throttling
+    try:
+        result = subprocess.run(["vcgencmd", "get_throttled"], capture_output=True, text=True, timeout=3)
+        code = int(result.stdout.strip().split("=")[1], 16)
+        return float(bool(code & 0x4)), float(bool(code & 0x1))
+    except Exception:
+        return None, None
+
+def collect_sample() -> dict:
+    throttled, under_voltage = read_throttle_flags()
+    return {
+        "cpu_usage": psutil.cpu_percent(interval=None),
+        "cpu_temp": read_cpu_temp(),
+        "ram_percent": psutil.virtual_memory().percent,
+        "disk_percent": psutil.disk_usage("/").percent,
+        "throttled": throttled,
+        "under_voltage": under_voltage,
+    }
+
+# ==========================
+# Uplink
+# ==========================
+def read_export_state() -> float:
+    try:
+        with open(EXPORT_STATE_FILE, "r") as f:
+            return float(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0.0
+
+def write_export_state(last_exported: float):
+    tmp = EXPORT_STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{last_exported}\n")
+    os.replace(tmp, EXPORT_STATE_FILE)
+
+def split_points(payload: dict, points: list) -> list[list]:
+    """
+    Divide os pontos em pedaços de até EXPORT_MAX_POINTS cuja mensagem no spool
+    (mais o overhead da requisição) cabe na fatia do orçamento da lane.
+    """
+    limit = max_message_bytes(UPLINK_LANE)
+    if limit is not None:
+        limit -= REQUEST_OVERHEAD_BYTES + message_bytes("/metrics", {**payload, "points": []})
+
+    chunks, chunk, size = [], [], 0
+    for point in points:
+        point_size = len(json.dumps(point)) + (2 if chunk else 0)  # ", " entre pontos
+        if chunk and (len(chunk) >= EXPORT_MAX_POINTS or (limit is not None and size + point_size > limit)):
+            chunks.append(chunk)
+            chunk, size, point_size = [], 0, point_size - 2
+        chunk.append(point)
+        size += point_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def export_to_uplink(store: RoundRobinStore) -> bool:
+    """Entrega ao uplink os buckets fechados desde o último export, em pedaços que cabem no orçamento."""
+    since = read_export_state()
+    payload = store.export(EXPORT_ARCHIVE, since + 1)
+    # O fetch arredonda o início para baixo até o bucket que contém `since`,
+    # que já foi enviado no export anterior
+    points = [point for point in payload["points"] if point["t"] > since]
+
+    for chunk in split_points(payload, points):
+        try:
+            # Chave = primeiro bucket: se o serviço cair antes de gravar o estado,
+            # o pedaço reenfileirado substitui o anterior em vez de duplicar
+            enqueue_uplink(UPLINK_LANE, "/metrics", {**payload, "points": chunk},
+                           coalesce_key=f"metrics-{chunk[0]['t']}")
+        except OSError as e:
+            log("ERROR", f"Failed to enqueue uplink message: {e}")
+            return False
+        log("INFO", f"Metrics export queued ({len(chunk)} points)")
+        write_export_state(chunk[-1]["t"])
+    return True
+
+# ==========================
+# Main Loop
+# ==========================
+def run():
+    log("INFO", f"Starting KombiOS Metrics Service (rrd={RRD_FILE})")
+    store = RoundRobinStore(RRD_FILE)
+    psutil.cpu_percent(interval=None)  # primeira leitura do psutil é sempre 0
+    next_export = time.monotonic() + EXPORT_INTERVAL_SEC
+
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                store.update(collect_sample())
+            except Exception as e:
+                log("ERROR", f"Failed to record sample: {e}")
+
+            if time.monotonic() >= next_export:
+                export_to_uplink(store)
+                next_export = time.monotonic() + EXPORT_INTERVAL_SEC
+
+            time.sleep(max(0.0, SAMPLE_INTERVAL_SEC - (time.monotonic() - started)))
+    finally:
+        store.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="KombiOS device health metrics")
+    sub = parser.add_subparsers(dest="command")
+    export = sub.add_parser("export", help="print a recorded series as JSON")
+    export.add_argument("--archive", default=EXPORT_ARCHIVE, choices=[name for name, _, _ in ARCHIVES])
+    export.add_argument("--since", type=float, default=0.0, help="unix timestamp (default: everything)")
+    export.add_argument("--until", type=float, default=None, help="unix timestamp (default: now)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        store = RoundRobinStore(RRD_FILE)
+        print(json.dumps(store.export(args.archive, args.since, args.until, include_open=True)))
+        store.close()
+    else:
+        run()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        log("INFO", "Service interrupted by user. Exiting.")
@@ -10,6 +10,8 @@ USER_NAME="kombios"
 LOG_DIR="/var/log/kombios/network"
 SCRIPT_FILE="/usr/local/bin/kombios/${SERVICE_NAME}.py"
 SERVICE_FILE="/etc/systemd/system/${SERVICE_NAME}.service"
+SHARED_MODULE="/usr/local/bin/kombios/kombios_uplink.py"
+UPLINK_SPOOL_DIR="/var/log/kombios/uplink/spool"
 
 LOG_FILES=(
   "$LOG_DIR/current.data"
@@ -35,6 +37,16 @@ sudo cp "./${SERVICE_NAME}.py" "$SCRIPT_FILE"
 sudo chmod +x "$SCRIPT_FILE"
 sudo chown "$USER_NAME:$USER_NAME" "$SCRIPT_FILE"
 
+# Copy shared uplink module (imported by the script)
+echo "Copying shared module to $SHARED_MODULE"
+sudo cp "../common/kombios_uplink.py" "$SHARED_MODULE"
+sudo chown "$USER_NAME:$USER_NAME" "$SHARED_MODULE"
+
+# Create uplink spool directory (messages are queued here for kombios-uplink-service)
+echo "Creating uplink spool directory: $UPLINK_SPOOL_DIR"
+sudo mkdir -p "$UPLINK_SPOOL_DIR"
+sudo chown "$USER_NAME:$USER_NAME" "$UPLINK_SPOOL_DIR"
+
 # Copy systemd service file
 echo "Copying systemd service file to $SERVICE_FILE"
 sudo cp "./${SERVICE_NAME}.service" "$SERVICE_FILE"
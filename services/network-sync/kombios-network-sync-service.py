@@ -3,22 +3,20 @@ import os
 import time
 import json
 import hashlib
-import requests
 from datetime import datetime
 from typing import Tuple, Optional
 from pydantic import BaseModel, ValidationError
 
+from kombios_uplink import enqueue_uplink
+
 # ==========================
 # Global Configurations
 # ==========================
 FILE_PATH = "/var/log/kombios/network/current.data"
-SERVER_URL = os.getenv("SERVER_URL")
-if not SERVER_URL:
-    raise RuntimeError("SERVER_URL is not defined")
-
-POST_URL = f"{SERVER_URL}/network"
+POST_PATH = "/network"
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "60"))
-MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+
+UPLINK_LANE = "network_status"
 
 # ==========================
 # Utility Functions
@@ -80,41 +78,11 @@ def build_payload(content: str) -> dict:
     except AttributeError:
         return model.dict()
 
-# ==========================
-# HTTP POST
-# ==========================
-def post_json(payload: dict) -> bool:
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": f"KombiOS/1.0.0 ({system_serial()})",
-        "Kombi-Id": system_serial(),
-    }
-
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            resp = requests.post(POST_URL, data=json.dumps(payload), headers=headers, timeout=5)
-            log("INFO", f"Server response: {resp.status_code}")
-            if 200 <= resp.status_code < 300:
-                return True
-            else:
-                try:
-                    err = resp.json()
-                except Exception:
-                    err = resp.text
-                log("WARN", f"Attempt {attempt}/{MAX_RETRIES} failed: {err}")
-        except requests.RequestException as e:
-            log("ERROR", f"Attempt {attempt}/{MAX_RETRIES} failed: {e}")
-
-        if attempt < MAX_RETRIES:
-            time.sleep(attempt)
-
-    return False
-
 # ==========================
 # Main Loop (watch file hash)
 # ==========================
 def main():
-    log("INFO", "Starting KombiOS Network sender (REST/JSON)")
+    log("INFO", "Starting KombiOS Network sender (uplink spool)")
     last_hash = None
 
     while True:
@@ -124,18 +92,19 @@ def main():
             log("WARN", f"File not found: {FILE_PATH}")
         elif current_hash != last_hash and content is not None:
             try:
-                log("INFO", f"File changed, sending to {POST_URL}...")
+                log("INFO", f"File changed, queueing {POST_PATH} for uplink...")
                 payload = build_payload(content)
             except (json.JSONDecodeError, ValidationError) as e:
                 log("ERROR", f"Failed to build payload: {e}")
                 time.sleep(CHECK_INTERVAL)
                 continue
 
-            if post_json(payload):
-                log("INFO", "Data sent successfully (REST/JSON).")
+            try:
+                enqueue_uplink(UPLINK_LANE, POST_PATH, payload, coalesce_key="network")
+                log("INFO", "Data queued for uplink.")
                 last_hash = current_hash
-            else:
-                log("ERROR", "Failed to send data after retries.")
+            except OSError as e:
+                log("ERROR", f"Failed to enqueue uplink message: {e}")
 
         time.sleep(CHECK_INTERVAL)
 
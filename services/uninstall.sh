@@ -86,6 +86,13 @@ for SCRIPT in "${SCRIPTS[@]}"; do
   COUNT=$((COUNT + 1))
 done
 
+########################################
+# STEP 3: Remove shared Python modules
+########################################
+for MODULE in "${BASE_DIR}"/common/*.py; do
+  run ${SUDO} rm -f "/usr/local/bin/kombios/$(basename "${MODULE}")"
+done
+
 ########################################
 # Summary
 ########################################
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+KombiOS Uplink Service.
+
+Único ponto de saída HTTP da Kombi. Os outros serviços (gps-sync,
+network-sync, metrics) não fazem POST direto: gravam a mensagem num spool em
+disco (kombios_uplink.enqueue_uplink) e este serviço envia, por uma sessão HTTP keep-alive compartilhada,
+respeitando prioridade e o orçamento de dados móveis.
+
+Spool: um arquivo JSON por mensagem em UPLINK_SPOOL_DIR, nome
+"<lane>.<chave>.json", com {"path": "/gps/last-position", "body": {...}}.
+Mensagens "latest" usam sempre a mesma chave, então uma nova posição
+substitui (coalesce) a anterior que ainda não foi enviada.
+
+Lanes (maior prioridade primeiro) e fração do orçamento que cada uma pode usar:
+
+    geofence_alert   100%
+    latest_position   90%
+    network_status    75%
+    history_backfill  50%
+
+Quando o consumo da hora/mês passa da fração de uma lane, ela para de enviar
+(as de menor prioridade param primeiro). O consumo é persistido em disco.
+Uma mensagem maior que a fatia da sua lane fica retida no spool (com aviso)
+até o orçamento ser aumentado; o metrics já divide o histórico em pedaços que
+cabem (kombios_uplink.max_message_bytes).
+"""
+import json
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from kombios_uplink import HOURLY_BUDGET_BYTES, LANES, MONTHLY_BUDGET_BYTES, REQUEST_OVERHEAD_BYTES
+
+# ==========================
+# Global Configurations
+# ==========================
+SERVER_URL = os.getenv("SERVER_URL")
+if not SERVER_URL:
+    raise RuntimeError("SERVER_URL is not defined")
+
+SPOOL_DIR = os.getenv("UPLINK_SPOOL_DIR", "/var/log/kombios/uplink/spool")
+INFLIGHT_DIR = os.path.join(SPOOL_DIR, "inflight")
+BUDGET_STATE_FILE = os.getenv("UPLINK_BUDGET_STATE_FILE", "/var/log/kombios/uplink/budget.state")
+
+POLL_INTERVAL_SEC = float(os.getenv("UPLINK_POLL_INTERVAL_SEC", "1"))
+HTTP_TIMEOUT_SEC = 10
+MAX_BACKOFF_SEC = 300
+MAX_MESSAGES_PER_LANE = int(os.getenv("UPLINK_MAX_MESSAGES_PER_LANE", "1000"))
+
+# 4xx que indicam "tente mais tarde" (timeout do servidor, rate limit): entram no
+# backoff como falha de rede. Os demais 4xx não vão passar reenviando.
+RETRYABLE_STATUS = {408, 429}
+
+
+# ==========================
+# Utility Functions
+# ==========================
+def log(level: str, message: str):
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] [{level}] {message}")
+
+def system_serial() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("Serial"):
+                    return line.split(":")[1].strip()
+    except Exception:
+        pass
+    return "unknown"
+
+def write_json_atomic(path: str, data: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+# ==========================
+# Byte budget
+# ==========================
+class ByteBudget:
+    """Consumo de dados na hora e no mês correntes, persistido entre reinícios."""
+
+    def __init__(self, path: str, hourly_limit: int, monthly_limit: int):
+        self.path = path
+        self.hourly_limit = hourly_limit
+        self.monthly_limit = monthly_limit
+        self.state = {"hour": None, "hour_bytes": 0, "month": None, "month_bytes": 0}
+        try:
+            with open(path, "r") as f:
+                self.state.update(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        self._roll()
+
+    def _roll(self):
+        now = datetime.now()
+        hour, month = now.strftime("%Y-%m-%dT%H"), now.strftime("%Y-%m")
+        if self.state["hour"] != hour:
+            self.state["hour"], self.state["hour_bytes"] = hour, 0
+        if self.state["month"] != month:
+            self.state["month"], self.state["month_bytes"] = month, 0
+
+    def window(self) -> tuple:
+        """Hora e mês correntes do orçamento (mudam quando o consumo zera)."""
+        self._roll()
+        return self.state["hour"], self.state["month"]
+
+    def fits(self, lane: str, size: int) -> bool:
+        """False se a mensagem é maior que a fatia da lane mesmo com o consumo zerado."""
+        share = LANES[lane][1]
+        if self.hourly_limit and size > self.hourly_limit * share:
+            return False
+        if self.monthly_limit and size > self.monthly_limit * share:
+            return False
+        return True
+
+    def allows(self, lane: str, size: int) -> bool:
+        self._roll()
+        share = LANES[lane][1]
+        if self.hourly_limit and self.state["hour_bytes"] + size > self.hourly_limit * share:
+            return False
+        if self.monthly_limit and self.state["month_bytes"] + size > self.monthly_limit * share:
+            return False
+        return True
+
+    def consume(self, size: int):
+        self._roll()
+        self.state["hour_bytes"] += size
+        self.state["month_bytes"] += size
+        try:
+            write_json_atomic(self.path, self.state)
+        except OSError as e:
+            log("ERROR", f"Failed to persist byte budget: {e}")
+
+# ==========================
+# Spool
+# ==========================
+def read_message(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r") as f:
+            message = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        log("ERROR", f"Dropping unreadable message {path}: {e}")
+        os.remove(path)
+        return None
+    if not message.get("path"):
+        log("ERROR", f"Dropping message without path: {path}")
+        os.remove(path)
+        return None
+    return message
+
+def recover_inflight():
+    # Mensagens que estavam sendo enviadas quando o serviço caiu voltam para o spool,
+    # a menos que já exista uma versão mais nova (coalesce) esperando.
+    for name in os.listdir(INFLIGHT_DIR):
+        target = os.path.join(SPOOL_DIR, name)
+        if os.path.exists(target):
+            os.remove(os.path.join(INFLIGHT_DIR, name))
+        else:
+            os.replace(os.path.join(INFLIGHT_DIR, name), target)
+
+def spool_mtime() -> int:
+    # Gravar (os.replace) ou remover uma mensagem muda o mtime do diretório
+    return os.stat(SPOOL_DIR).st_mtime_ns
+
+def pending_messages() -> list[dict]:
+    """
+    Mensagens do spool ordenadas por prioridade da lane e depois por idade.
+    Só lista nomes e faz stat: o conteúdo é lido apenas na hora do envio.
+    """
+    messages = []
+    for entry in os.scandir(SPOOL_DIR):
+        if entry.name.startswith(".") or not entry.name.endswith(".json") or not entry.is_file():
+            continue
+        lane = entry.name.split(".", 1)[0]
+        if lane not in LANES:
+            log("ERROR", f"Dropping message for unknown lane: {entry.name}")
+            os.remove(entry.path)
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        messages.append({"file": entry.name, "lane": lane, "size": stat.st_size, "mtime": stat.st_mtime_ns})
+    messages.sort(key=lambda m: (LANES[m["lane"]][0], m["mtime"]))
+
+    # Limita o tamanho do spool: descarta as mais antigas de cada lane
+    per_lane = {}
+    kept = []
+    for message in reversed(messages):
+        per_lane[message["lane"]] = per_lane.get(message["lane"], 0) + 1
+        if per_lane[message["lane"]] > MAX_MESSAGES_PER_LANE:
+            log("WARN", f"Spool full for lane {message['lane']}, dropping {message['file']}")
+            os.remove(os.path.join(SPOOL_DIR, message["file"]))
+        else:
+            kept.append(message)
+    kept.reverse()
+    return kept
+
+# ==========================
+# Scheduler
+# ==========================
+class UplinkScheduler:
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "User-Agent": f"KombiOS/1.0.0 ({system_serial()})",
+            "Kombi-Id": system_serial(),
+        })
+        self.budget = ByteBudget(BUDGET_STATE_FILE, HOURLY_BUDGET_BYTES, MONTHLY_BUDGET_BYTES)
+        self.failures = 0
+        self.retry_at = 0.0
+        self.throttled: set[str] = set()
+        self.oversized: set[str] = set()
+        # mtime do spool visto por último (depois das nossas próprias mudanças)
+        self.seen_mtime = None
+        # (mtime do spool, janela do orçamento) da última varredura sem nada enviável
+        self.idle_key = None
+
+    def send(self, message: dict, data: bytes) -> bool:
+        inflight = os.path.join(INFLIGHT_DIR, message["file"])
+        try:
+            # Tira do spool antes de enviar: uma mensagem nova com a mesma chave
+            # pode ser gravada enquanto esta está em trânsito sem ser apagada depois.
+            os.replace(os.path.join(SPOOL_DIR, message["file"]), inflight)
+            self.seen_mtime = spool_mtime()
+        except FileNotFoundError:
+            return True  # descartada pelo limite do spool: nada a enviar
+
+        sent = False
+        size = len(data) + REQUEST_OVERHEAD_BYTES
+        try:
+            resp = self.session.post(f"{SERVER_URL}{message['path']}", data=data, timeout=HTTP_TIMEOUT_SEC)
+            size += len(resp.content)
+            log("INFO", f"[{message['lane']}] {message['path']} -> {resp.status_code}")
+            sent = 200 <= resp.status_code < 300
+            if 400 <= resp.status_code < 500 and resp.status_code not in RETRYABLE_STATUS:
+                # Erro do cliente: reenviar não vai resolver
+                log("ERROR", f"Dropping {message['file']}: {resp.text[:200]}")
+                sent = True
+        except requests.RequestException as e:
+            log("ERROR", f"[{message['lane']}] {message['path']} failed: {e}")
+            size = REQUEST_OVERHEAD_BYTES if isinstance(e, requests.ConnectionError) else size
+        finally:
+            self.budget.consume(size)
+
+        if sent:
+            os.remove(inflight)
+        elif os.path.exists(os.path.join(SPOOL_DIR, message["file"])):
+            os.remove(inflight)  # já foi substituída por uma mais nova
+        else:
+            os.replace(inflight, os.path.join(SPOOL_DIR, message["file"]))
+        return sent
+
+    def run_once(self) -> bool:
+        """
+        Varre o spool uma vez e envia as mensagens elegíveis em ordem de prioridade.
+        A varredura é refeita quando chega mensagem nova (pode ser de prioridade
+        maior) ou quando o orçamento vira de hora/mês. Retorna True se enviou algo.
+        """
+        if time.monotonic() < self.retry_at:
+            return False
+        if self.idle_key is not None and self.idle_key == (spool_mtime(), self.budget.window()):
+            return False  # nada mudou desde a última varredura sem envio
+
+        sent_any = False
+        self.seen_mtime = spool_mtime()
+        scanned_key = (self.seen_mtime, self.budget.window())
+        for message in pending_messages():
+            if spool_mtime() != self.seen_mtime:
+                self.idle_key = None
+                return True  # chegou mensagem nova: volta logo para varrer de novo
+
+            lane = message["lane"]
+            size = message["size"] + REQUEST_OVERHEAD_BYTES
+            if not self.budget.fits(lane, size):
+                if message["file"] not in self.oversized:
+                    log("WARN", f"Holding {message['file']}: {size} bytes exceed the budget share of lane {lane}")
+                    self.oversized.add(message["file"])
+                continue
+            if not self.budget.allows(lane, size):
+                if lane not in self.throttled:
+                    log("WARN", f"Byte budget reached for lane {lane}, holding messages")
+                    self.throttled.add(lane)
+                continue
+            if lane in self.throttled:
+                log("INFO", f"Lane {lane} resumed")
+                self.throttled.discard(lane)
+
+            content = read_message(os.path.join(SPOOL_DIR, message["file"]))
+            if content is None:
+                self.seen_mtime = spool_mtime()
+                continue
+            message["path"] = content["path"]
+
+            if self.send(message, json.dumps(content.get("body")).encode()):
+                self.failures = 0
+                sent_any = True
+                continue
+
+            # Falha de rede ou 408/429: backoff exponencial para todas as lanes (sem dormir aqui)
+            self.failures += 1
+            delay = min(2 ** self.failures, MAX_BACKOFF_SEC)
+            self.retry_at = time.monotonic() + delay
+            self.idle_key = None
+            log("WARN", f"Uplink failing ({self.failures}x), retrying in {delay}s")
+            return sent_any
+
+        # Sem envio, o resultado só muda com mensagem nova ou virada do orçamento
+        self.idle_key = None if sent_any else scanned_key
+        return sent_any
+
+def main():
+    log("INFO", f"Starting KombiOS Uplink Service (spool={SPOOL_DIR}, server={SERVER_URL})")
+    os.makedirs(INFLIGHT_DIR, exist_ok=True)
+    recover_inflight()
+
+    scheduler = UplinkScheduler()
+    while True:
+        try:
+            if scheduler.run_once():
+                continue  # esvazia o spool o mais rápido que o orçamento permitir
+        except Exception as e:
+            log("ERROR", f"Unexpected error: {e}")
+        time.sleep(POLL_INTERVAL_SEC)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        log("INFO", "Service interrupted by user. Exiting.")